@@ -0,0 +1,239 @@
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import create_engine, exists
+from datetime import datetime, timedelta
+import argparse
+import os
+import random
+import struct
+import tempfile
+
+import models
+import database
+
+# Byte layout of an ArchivedAnswers record (all arrays have one entry per answer, same order)
+UNANSWERED = 0x7F   # option index used when the question was skipped
+CORRECT_FLAG = 0x80 # high bit of the selection byte
+NO_TIMING = 0xFFFF  # timing sentinel when time_taken was not recorded
+
+def pack_answers(result_id, answers, options):
+    """Build an ArchivedAnswers for one QuizResult. Returns None if an answer can't be stored losslessly."""
+    question_ids, selections, timings = [], bytearray(), []
+    for ans in answers:
+        opts = options.get(ans.question_id)
+        if opts is None or ans.is_correct is None or ans.selected_option == "":
+            return None
+        if ans.time_taken is not None and not 0 <= ans.time_taken < NO_TIMING:
+            return None
+        if ans.selected_option is not None:
+            if ans.selected_option not in opts:
+                return None
+            idx = opts.index(ans.selected_option)
+            if idx >= UNANSWERED:
+                return None
+        else:
+            idx = UNANSWERED
+        selections.append(idx | (CORRECT_FLAG if ans.is_correct else 0))
+        question_ids.append(ans.question_id)
+        timings.append(NO_TIMING if ans.time_taken is None else ans.time_taken)
+
+    n = len(question_ids)
+    return models.ArchivedAnswers(
+        user_id=answers[0].user_id if answers else None,
+        quiz_result_id=result_id,
+        question_ids=struct.pack(f"<{n}I", *question_ids),
+        selections=bytes(selections),
+        timings=struct.pack(f"<{n}H", *timings),
+    )
+
+def decode_archive(archive):
+    """Yield (question_id, option_index or None, is_correct, time_taken) per archived answer."""
+    n = len(archive.selections)
+    question_ids = struct.unpack(f"<{n}I", archive.question_ids)
+    timings = struct.unpack(f"<{n}H", archive.timings)
+    for q_id, sel, t in zip(question_ids, archive.selections, timings):
+        idx = sel & ~CORRECT_FLAG
+        yield q_id, (None if idx == UNANSWERED else idx), bool(sel & CORRECT_FLAG), (None if t == NO_TIMING else t)
+
+def option_text(options, idx):
+    """Selected option text for an index from decode_archive, given the question's options list."""
+    if idx is None or not options or idx >= len(options):
+        return None
+    return options[idx]
+
+def unpack_answers(db: Session, archive):
+    """Rebuild (transient, never added to the session) UserAnswer objects from an archive record."""
+    decoded = list(decode_archive(archive))
+    questions = {q.id: q for q in db.query(models.Question).filter(models.Question.id.in_({d[0] for d in decoded})).all()}
+
+    answers = []
+    for q_id, idx, is_correct, time_taken in decoded:
+        q = questions.get(q_id)
+        answers.append(models.UserAnswer(
+            user_id=archive.user_id,
+            quiz_result_id=archive.quiz_result_id,
+            question_id=q_id,
+            question=q,
+            selected_option=option_text(q.options if q else None, idx),
+            is_correct=is_correct,
+            time_taken=time_taken
+        ))
+    return answers
+
+def load_answers(db: Session, result_id: int):
+    """Answers of a QuizResult, from user_answers if still live, else from the archive."""
+    answers = db.query(models.UserAnswer).filter(models.UserAnswer.quiz_result_id == result_id).all()
+    if answers:
+        return answers
+    archive = db.query(models.ArchivedAnswers).filter(models.ArchivedAnswers.quiz_result_id == result_id).first()
+    if not archive:
+        return []
+    return unpack_answers(db, archive)
+
+def archive_old_answers(db: Session, older_than_days: int = 180, batch_size: int = 500, max_batches: int = None, retry_skipped: bool = False):
+    """
+    Move UserAnswer rows of results older than the cutoff into ArchivedAnswers.
+    Commits after each batch, so it can be interrupted and re-run; results that are
+    already archived no longer have live rows, and results that couldn't be packed are
+    recorded in ArchiveSkip, so neither is picked up again (unless retry_skipped).
+    """
+    if retry_skipped:
+        db.query(models.ArchiveSkip).delete(synchronize_session=False)
+        db.commit()
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    # Plain values, not Question objects: those get expired on commit and detached by expunge_all
+    options = {q_id: opts for q_id, opts in db.query(models.Question.id, models.Question.options).all()}
+    last_id = 0
+    archived = skipped = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        result_ids = [r for (r,) in db.query(models.QuizResult.id)
+            .filter(models.QuizResult.date < cutoff, models.QuizResult.id > last_id)
+            .filter(models.QuizResult.answers.any())
+            .filter(~exists().where(models.ArchiveSkip.quiz_result_id == models.QuizResult.id))
+            .order_by(models.QuizResult.id)
+            .limit(batch_size).all()]
+        if not result_ids:
+            break
+        last_id = result_ids[-1]
+
+        rows = (db.query(models.UserAnswer).filter(models.UserAnswer.quiz_result_id.in_(result_ids))
+            .order_by(models.UserAnswer.quiz_result_id, models.UserAnswer.id).all())
+        by_result = {}
+        for ans in rows:
+            by_result.setdefault(ans.quiz_result_id, []).append(ans)
+
+        packed_ids = []
+        for result_id, answers in by_result.items():
+            record = pack_answers(result_id, answers, options)
+            if record is None:
+                db.add(models.ArchiveSkip(quiz_result_id=result_id)) # Keep the live rows, they still work as before
+                skipped += 1
+                continue
+            db.add(record)
+            packed_ids.append(result_id)
+
+        if packed_ids:
+            db.query(models.UserAnswer).filter(models.UserAnswer.quiz_result_id.in_(packed_ids)).delete(synchronize_session=False)
+        db.commit()
+        db.expunge_all()
+        archived += len(packed_ids)
+        batches += 1
+
+    return {"archived": archived, "skipped": skipped}
+
+def _db_size(engine):
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+        page_count = conn.exec_driver_sql("PRAGMA page_count").scalar()
+    return page_size * page_count
+
+def estimate_savings(sample_rows: int = 200000, target_rows: int = 50000000, seed: int = 0):
+    """
+    Build a synthetic user_answers table of sample_rows, archive it and measure the DB size
+    before and after. The target_rows figures are a linear projection from that sample,
+    not a measurement on target_rows.
+    """
+    rng = random.Random(seed)
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        database.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        import seed_data
+        seed_data.seed_questions(db)
+        questions = db.query(models.Question).all()
+
+        per_mock = 100
+        old = datetime.utcnow() - timedelta(days=365)
+        db.add(models.User(id=1, username="synthetic", hashed_password=""))
+        for r_id in range(1, sample_rows // per_mock + 1):
+            db.add(models.QuizResult(id=r_id, user_id=1, quiz_type="Mock Test", date=old))
+        db.commit()
+
+        answer_rows = []
+        for i in range(sample_rows):
+            q = rng.choice(questions)
+            selected = rng.choice(q.options + [None])
+            answer_rows.append({
+                "user_id": 1, "quiz_result_id": i // per_mock + 1, "question_id": q.id,
+                "selected_option": selected, "is_correct": selected == q.correct_option,
+                "time_taken": rng.randint(5, 120)
+            })
+        db.execute(models.UserAnswer.__table__.insert(), answer_rows)
+        db.commit()
+
+        before = _db_size(engine)
+        archive_old_answers(db, older_than_days=30, batch_size=1000)
+        after = _db_size(engine)
+        db.close()
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+    scale = target_rows / sample_rows
+    return {
+        "sample_rows": sample_rows,
+        "seed": seed,
+        "sample_mb_before": round(before / 1024 / 1024, 1),
+        "sample_mb_after": round(after / 1024 / 1024, 1),
+        "bytes_per_answer_before": round(before / sample_rows, 1),
+        "bytes_per_answer_after": round(after / sample_rows, 1),
+        "target_rows": target_rows,
+        "projected_mb_before": round(before * scale / 1024 / 1024),
+        "projected_mb_after": round(after * scale / 1024 / 1024),
+        "reduction_pct": round((1 - after / before) * 100, 1),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact old UserAnswer rows into archived_answers")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    run = sub.add_parser("compact", help="Archive answers of results older than --days (incremental, safe to re-run)")
+    run.add_argument("--days", type=int, default=180)
+    run.add_argument("--batch-size", type=int, default=500)
+    run.add_argument("--max-batches", type=int, default=None)
+    run.add_argument("--vacuum", action="store_true", help="Reclaim freed space afterwards")
+    run.add_argument("--retry-skipped", action="store_true", help="Try results that previously couldn't be packed again")
+    est = sub.add_parser("estimate", help="Report size reduction on a synthetic dataset, projected to --target rows")
+    est.add_argument("--sample", type=int, default=200000)
+    est.add_argument("--target", type=int, default=50000000)
+    est.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.cmd == "compact":
+        database.init_db()
+        db = database.SessionLocal()
+        try:
+            stats = archive_old_answers(db, args.days, args.batch_size, args.max_batches, args.retry_skipped)
+            print(f"Archived {stats['archived']} results, skipped {stats['skipped']}")
+        finally:
+            db.close()
+        if args.vacuum:
+            with database.engine.connect() as conn:
+                conn.exec_driver_sql("VACUUM")
+    else:
+        report = estimate_savings(args.sample, args.target, args.seed)
+        for k, v in report.items():
+            print(f"{k}: {v}")
+        print(f"(projected_* values are a linear projection from {args.sample} sampled rows to {args.target})")
@@ -14,6 +14,9 @@ Base = declarative_base()
 def init_db():
     import models
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add indexes introduced later by hand
+    for index in models.UserAnswer.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
     
     # Seed Data
     import seed_data
@@ -0,0 +1,191 @@
+from sqlalchemy.orm import Session
+import argparse
+import csv
+import io
+import json
+import sys
+
+import models
+import database
+import archive
+
+# Rows are fetched a page at a time by keyset, each page in its own short read transaction
+# that is ended before anything is yielded. A slow download therefore never holds a lock
+# writers wait on, and memory stays flat no matter how many mocks the user has taken.
+CHUNK_SIZE = 1000
+RESULTS_PER_CHUNK = 20 # results per page; their answers (100 per mock) are fetched with them
+
+CSV_FIELDS = [
+    "type", "cursor",
+    "result_id", "quiz_type", "subject", "date", "score", "total_questions",
+    "attempted", "correct", "wrong", "accuracy", "time_taken_seconds",
+    "question_id", "selected_option", "is_correct", "time_taken",
+    "mistake_id", "count", "mastered", "last_reviewed",
+]
+
+# Cursor format: "r<result_id>" resumes at that result (header + all its answers),
+# "m<mistake_id>" means all results are done and resumes at that mistake.
+# Every exported row carries the cursor of the group it belongs to, so a client
+# passes the cursor of the last row it received and that group is re-sent in full.
+
+def parse_cursor(cursor):
+    if not cursor:
+        return "r", 0
+    if cursor[0] not in ("r", "m") or not cursor[1:].isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return cursor[0], int(cursor[1:])
+
+def _fmt_date(value):
+    return value.isoformat() if value else None
+
+def _live_answers_query(db: Session, result_ids):
+    # Served by ix_user_answers_result_id (quiz_result_id, id): an index search, no table scan or sort
+    return (db.query(
+            models.UserAnswer.quiz_result_id, models.UserAnswer.question_id,
+            models.UserAnswer.selected_option, models.UserAnswer.is_correct, models.UserAnswer.time_taken)
+        .filter(models.UserAnswer.quiz_result_id.in_(result_ids))
+        .order_by(models.UserAnswer.quiz_result_id, models.UserAnswer.id))
+
+def _result_page(db: Session, user_id: int, start: int, limit: int):
+    """Records for up to `limit` results with id >= start (each followed by its answers), and the last id seen."""
+    rows = (db.query(models.QuizResult, models.ArchivedAnswers)
+        .outerjoin(models.ArchivedAnswers, models.ArchivedAnswers.quiz_result_id == models.QuizResult.id)
+        .filter(models.QuizResult.user_id == user_id, models.QuizResult.id >= start)
+        .order_by(models.QuizResult.id)
+        .limit(limit).all())
+    if not rows:
+        return [], None
+
+    live = {}
+    for a in _live_answers_query(db, [r.id for r, _ in rows]):
+        live.setdefault(a.quiz_result_id, []).append(a)
+
+    decoded = {r.id: list(archive.decode_archive(arc)) for r, arc in rows if arc is not None}
+    q_ids = {d[0] for answers in decoded.values() for d in answers}
+    options = dict(db.query(models.Question.id, models.Question.options).filter(models.Question.id.in_(q_ids))) if q_ids else {}
+
+    records = []
+    for r, _ in rows:
+        row_cursor = f"r{r.id}"
+        records.append({
+            "type": "result", "cursor": row_cursor, "result_id": r.id,
+            "quiz_type": r.quiz_type, "subject": r.subject, "date": _fmt_date(r.date),
+            "score": r.score, "total_questions": r.total_questions, "attempted": r.attempted,
+            "correct": r.correct, "wrong": r.wrong, "accuracy": r.accuracy,
+            "time_taken_seconds": r.time_taken_seconds,
+        })
+        for a in live.get(r.id, []):
+            records.append({
+                "type": "answer", "cursor": row_cursor, "result_id": r.id,
+                "question_id": a.question_id, "selected_option": a.selected_option,
+                "is_correct": a.is_correct, "time_taken": a.time_taken,
+            })
+        for q_id, idx, is_correct, time_taken in decoded.get(r.id, []):
+            records.append({
+                "type": "answer", "cursor": row_cursor, "result_id": r.id,
+                "question_id": q_id, "selected_option": archive.option_text(options.get(q_id), idx),
+                "is_correct": is_correct, "time_taken": time_taken,
+            })
+    return records, rows[-1][0].id
+
+def _mistake_page(db: Session, user_id: int, start: int, limit: int):
+    rows = (db.query(models.Mistake)
+        .filter(models.Mistake.user_id == user_id, models.Mistake.id >= start)
+        .order_by(models.Mistake.id)
+        .limit(limit).all())
+    records = [{
+        "type": "mistake", "cursor": f"m{m.id}", "mistake_id": m.id,
+        "question_id": m.question_id, "count": m.count, "mastered": m.mastered,
+        "last_reviewed": _fmt_date(m.last_reviewed),
+    } for m in rows]
+    return records, (rows[-1].id if rows else None)
+
+def iter_history(db: Session, user_id: int, cursor: str = None, chunk_size: int = CHUNK_SIZE, results_per_chunk: int = RESULTS_PER_CHUNK):
+    """Yield export records (dicts) for a user's results, answers and mistakes in keyset order."""
+    section, start = parse_cursor(cursor)
+
+    if section == "r":
+        while True:
+            records, last_id = _result_page(db, user_id, start, results_per_chunk)
+            db.rollback() # End the read transaction before handing rows to a (possibly slow) client
+            if last_id is None:
+                break
+            yield from records
+            start = last_id + 1
+        start = 0
+
+    while True:
+        records, last_id = _mistake_page(db, user_id, start, chunk_size)
+        db.rollback()
+        if last_id is None:
+            break
+        yield from records
+        start = last_id + 1
+
+def iter_jsonl(records, chunk_size: int = CHUNK_SIZE):
+    buf = []
+    for rec in records:
+        buf.append(json.dumps(rec))
+        if len(buf) >= chunk_size:
+            yield "\n".join(buf) + "\n"
+            buf = []
+    if buf:
+        yield "\n".join(buf) + "\n"
+
+def iter_csv(records, chunk_size: int = CHUNK_SIZE):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS, restval="")
+    writer.writeheader()
+    n = 0
+    for rec in records:
+        writer.writerow(rec)
+        n += 1
+        if n % chunk_size == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+FORMATS = {"jsonl": iter_jsonl, "csv": iter_csv}
+
+def stream_export(user_id: int, fmt: str = "jsonl", cursor: str = None):
+    """
+    Generator of encoded export chunks. Opens its own session because the response
+    body is produced after the request's get_db dependency has already been closed.
+    No transaction is held open between chunks, see iter_history.
+    """
+    db = database.SessionLocal()
+    try:
+        yield from FORMATS[fmt](iter_history(db, user_id, cursor))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a user's full attempt history as CSV or JSONL")
+    parser.add_argument("username")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="jsonl")
+    parser.add_argument("--after", default=None, help="Resume cursor (the 'cursor' value of the last row received)")
+    parser.add_argument("-o", "--output", default=None, help="Output file (default: stdout)")
+    args = parser.parse_args()
+    try:
+        parse_cursor(args.after)
+    except ValueError as e:
+        parser.error(str(e))
+
+    db = database.SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.username == args.username).first()
+    finally:
+        db.close()
+    if not user:
+        print(f"No such user: {args.username}", file=sys.stderr)
+        sys.exit(1)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        for chunk in stream_export(user.id, args.format, args.after):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
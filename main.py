@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request, Form, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
@@ -11,6 +11,8 @@ import json
 
 import models
 import database
+import archive
+import export
 
 # Initialize DB
 database.init_db()
@@ -268,8 +270,8 @@ async def result_page(request: Request, result_id: int, db: Session = Depends(ge
     if not user: return RedirectResponse("/login")
     
     result = db.query(models.QuizResult).filter(models.QuizResult.id == result_id).first()
-    # Fetch detailed answers for review
-    answers = db.query(models.UserAnswer).filter(models.UserAnswer.quiz_result_id == result_id).all()
+    # Fetch detailed answers for review (old results are served from the compact archive)
+    answers = archive.load_answers(db, result_id)
     
     return templates.TemplateResponse("result.html", {
         "request": request, 
@@ -388,6 +390,25 @@ async def focus_page(request: Request):
     if not request.session.get("user_id"): return RedirectResponse("/login")
     return templates.TemplateResponse("focus.html", {"request": request})
 
+@app.get("/export")
+async def export_history(request: Request, format: str = "jsonl", after: str = None):
+    user_id = request.session.get("user_id")
+    if not user_id: return JSONResponse(status_code=401, content={"msg": "Login required"})
+    if format not in export.FORMATS:
+        return JSONResponse(status_code=400, content={"msg": "format must be csv or jsonl"})
+    try:
+        export.parse_cursor(after)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"msg": str(e)})
+
+    # Streamed chunk by chunk, each fetched by keyset in its own short read transaction
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export.stream_export(user_id, format, after),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=history.{format}"}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     # Use import string "main:app" with reload=True for auto-reload
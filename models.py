@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float, Text, JSON, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -53,9 +53,12 @@ class QuizResult(Base):
 
     user = relationship("User", back_populates="results")
     answers = relationship("UserAnswer", back_populates="result")
+    archive = relationship("ArchivedAnswers", back_populates="result", uselist=False)
 
 class UserAnswer(Base):
     __tablename__ = "user_answers"
+    # Per-result lookups (result page, archiving, export) read answers in id order
+    __table_args__ = (Index("ix_user_answers_result_id", "quiz_result_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -69,6 +72,27 @@ class UserAnswer(Base):
     result = relationship("QuizResult", back_populates="answers")
     question = relationship("Question")
 
+class ArchivedAnswers(Base):
+    # Compact replacement for the UserAnswer rows of one old QuizResult (see archive.py)
+    __tablename__ = "archived_answers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    quiz_result_id = Column(Integer, ForeignKey("quiz_results.id"), unique=True, index=True)
+    question_ids = Column(LargeBinary) # uint32 little-endian per answer
+    selections = Column(LargeBinary) # 1 byte per answer: option index (low 7 bits) + is_correct flag (0x80)
+    timings = Column(LargeBinary) # uint16 little-endian seconds per answer, 0xFFFF = not recorded
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    result = relationship("QuizResult", back_populates="archive")
+
+class ArchiveSkip(Base):
+    # A QuizResult whose answers pack_answers couldn't store losslessly; compact leaves it live and doesn't retry it
+    __tablename__ = "archive_skips"
+
+    quiz_result_id = Column(Integer, ForeignKey("quiz_results.id"), primary_key=True)
+    skipped_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 class Mistake(Base):
     __tablename__ = "mistakes"
 
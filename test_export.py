@@ -0,0 +1,134 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from datetime import datetime, timedelta
+import json
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import models
+import database
+import archive
+import export
+import seed_data
+
+USER_ID = 1
+RESULTS = 10000   # 100 answers each -> 1M answers
+PER_MOCK = 100
+MISTAKES = 50
+RSS_GROWTH_LIMIT_MB = 25
+
+# Drained in a fresh interpreter so the fixture's setup doesn't set the RSS high-water mark.
+# ru_maxrss covers everything in the process, including SQLite's page cache and driver buffers.
+DRAIN_SCRIPT = """
+import json, resource, sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import database, export
+database.SessionLocal = sessionmaker(bind=create_engine("sqlite:///" + sys.argv[1]))
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+lines = 0
+for chunk in export.stream_export(int(sys.argv[2]), sys.argv[3]):
+    lines += chunk.count("\\n")
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"lines": lines, "base": base, "peak": peak}))
+"""
+
+@pytest.fixture(scope="module")
+def history_db(tmp_path_factory):
+    """A temp SQLite file with a 1M-answer user: first half of the results archived, second half live."""
+    path = tmp_path_factory.mktemp("export") / "history.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    seed_data.seed_questions(db)
+    questions = [(q.id, q.options) for q in db.query(models.Question).all()]
+    rng = random.Random(0)
+
+    old = datetime.utcnow() - timedelta(days=400)
+    db.add(models.User(id=USER_ID, username="history", hashed_password=""))
+    db.execute(models.QuizResult.__table__.insert(), [{
+        "id": r_id, "user_id": USER_ID, "quiz_type": "Mock Test", "score": 50.0, "total_questions": PER_MOCK,
+        "date": old if r_id <= RESULTS // 2 else datetime.utcnow(),
+    } for r_id in range(1, RESULTS + 1)])
+    for first in range(1, RESULTS + 1, 1000):
+        rows = []
+        for r_id in range(first, min(first + 1000, RESULTS + 1)):
+            for _ in range(PER_MOCK):
+                q_id, opts = rng.choice(questions)
+                rows.append({
+                    "user_id": USER_ID, "quiz_result_id": r_id, "question_id": q_id,
+                    "selected_option": rng.choice(opts), "is_correct": rng.random() < 0.5,
+                    "time_taken": rng.randint(5, 120),
+                })
+        db.execute(models.UserAnswer.__table__.insert(), rows)
+    db.execute(models.Mistake.__table__.insert(), [
+        {"user_id": USER_ID, "question_id": questions[i % len(questions)][0]} for i in range(MISTAKES)])
+    db.commit()
+    archive.archive_old_answers(db, older_than_days=30, batch_size=1000)
+    assert db.query(models.ArchivedAnswers).count() == RESULTS // 2
+    db.close()
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(database, "SessionLocal", Session)
+        yield path
+    engine.dispose()
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_export_peak_rss_is_bounded(history_db, fmt):
+    pytest.importorskip("resource") # Unix only
+    out = subprocess.run(
+        [sys.executable, "-c", DRAIN_SCRIPT, str(history_db), str(USER_ID), fmt],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+    )
+    stats = json.loads(out.stdout)
+    unit = 1 if sys.platform == "darwin" else 1024 # ru_maxrss is bytes on macOS, KiB on Linux
+    growth_mb = (stats["peak"] - stats["base"]) * unit / 1024 / 1024
+
+    header = 1 if fmt == "csv" else 0
+    assert stats["lines"] == header + RESULTS + RESULTS * PER_MOCK + MISTAKES
+    assert growth_mb < RSS_GROWTH_LIMIT_MB, f"peak RSS grew by {growth_mb:.1f} MB while draining"
+
+def test_resume_matches_tail_of_full_export(history_db):
+    full = [line for chunk in export.stream_export(USER_ID, "jsonl") for line in chunk.splitlines()]
+    mid = RESULTS // 2 + 7 # just past the archived/live boundary
+    part = [line for chunk in export.stream_export(USER_ID, "jsonl", f"r{mid}") for line in chunk.splitlines()]
+    first = next(i for i, line in enumerate(full) if json.loads(line)["cursor"] == f"r{mid}")
+    assert part == full[first:]
+
+    archived = [json.loads(line) for line in full[:PER_MOCK + 1]]
+    assert archived[0]["type"] == "result" and archived[0]["result_id"] == 1
+    assert all(a["type"] == "answer" and a["selected_option"] is not None for a in archived[1:])
+
+    mistake_cursor = json.loads(full[-MISTAKES])["cursor"]
+    tail = [line for chunk in export.stream_export(USER_ID, "jsonl", mistake_cursor) for line in chunk.splitlines()]
+    assert tail == full[-MISTAKES:]
+
+def test_live_answer_page_uses_result_index(history_db):
+    db = database.SessionLocal()
+    try:
+        query = export._live_answers_query(db, [1, 2, 3]).statement
+        sql = str(query.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+        plan = " | ".join(row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql)))
+    finally:
+        db.close()
+    assert "USING INDEX ix_user_answers_result_id" in plan, plan
+    assert "SCAN user_answers" not in plan and "TEMP B-TREE" not in plan, plan
+
+def test_slow_download_does_not_block_writers(history_db):
+    stream = export.stream_export(USER_ID, "jsonl")
+    next(stream) # client has read one chunk and stalls
+
+    writer_engine = create_engine(f"sqlite:///{history_db}", connect_args={"timeout": 1})
+    writer = sessionmaker(bind=writer_engine)()
+    try:
+        writer.add(models.Task(user_id=USER_ID, title="written during export"))
+        writer.commit()
+    finally:
+        writer.close()
+        writer_engine.dispose()
+        stream.close()